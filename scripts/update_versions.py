@@ -12,16 +12,25 @@ and update every version constraint inside:
 If a file is modified, it is overwritten in-place. The script exits with code 0
 whether or not modifications were required. However, it prints a summary that is
 useful inside CI to decide if a commit is necessary.
+
+Registry lookups are cached for an hour in
+``$XDG_CACHE_HOME/create-kernel-app/versions.json`` (``~/.cache`` by default),
+alongside the stat of each template after it was last checked so unchanged files
+are not re-read. Pass ``--no-cache`` to neither read nor write the cache.
 """
 from __future__ import annotations
 
+import argparse
 import json
 import os
 import re
 import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Iterator, List
 
 try:
     import requests  # type: ignore
@@ -29,18 +38,47 @@ except ImportError:
     subprocess.check_call([sys.executable, "-m", "pip", "install", "requests"])
     import requests  # type: ignore
 
+from requests.adapters import HTTPAdapter  # type: ignore
+from urllib3.util.retry import Retry  # type: ignore
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # optional speed-up; stdlib json is used otherwise
+    orjson = None
+
 REPO_ROOT = Path(__file__).resolve().parent.parent
 PY_TEMPLATES_GLOB = REPO_ROOT / "templates" / "python" / "*" / "pyproject.toml"
 TS_TEMPLATES_GLOB = REPO_ROOT / "templates" / "typescript" / "*" / "package.json"
 
+CACHE_FILE = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "create-kernel-app"
+    / "versions.json"
+)
+CACHE_TTL_SECONDS = 3600
+
 
 # ---------------------------------------------------------------------------
 # Helpers to fetch latest versions
 # ---------------------------------------------------------------------------
 
+def _make_session() -> requests.Session:
+    """Build a keep-alive session that retries transient registry errors."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip"})
+    return session
+
+
+_SESSION = _make_session()
+
+
 def _get_latest_pypi_version(package: str) -> str:
     url = f"https://pypi.org/pypi/{package}/json"
-    resp = requests.get(url, timeout=10)
+    resp = _SESSION.get(url, timeout=10)
     resp.raise_for_status()
     data = resp.json()
     return data["info"]["version"]
@@ -52,35 +90,174 @@ def _get_latest_npm_version(package: str) -> str:
 
     encoded = _up.quote(package, safe="")
     url = f"https://registry.npmjs.org/{encoded}"
-    resp = requests.get(url, timeout=10)
+    resp = _SESSION.get(url, timeout=10)
     resp.raise_for_status()
     data = resp.json()
     return data["dist-tags"]["latest"]
 
 
+# ---------------------------------------------------------------------------
+# On-disk version cache
+# ---------------------------------------------------------------------------
+
+def _load_cache() -> Dict[str, Dict[str, object]]:
+    try:
+        data = json.loads(CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_cache(cache: Dict[str, Dict[str, object]]) -> None:
+    """Write the cache atomically; failures are non-fatal."""
+    tmp = None
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_FILE.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, CACHE_FILE)
+    except OSError as exc:
+        print(f"Warning: could not write version cache: {exc}")
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+def _cached_latest(
+    cache: Dict[str, Dict[str, object]],
+    key: str,
+    fetcher: Callable[[], str],
+    ttl: float = CACHE_TTL_SECONDS,
+) -> str:
+    """Return the cached version for *key* if fresh, otherwise call *fetcher*."""
+    entry = cache.get(key)
+    if isinstance(entry, dict):
+        version, ts = entry.get("version"), entry.get("ts")
+        if isinstance(version, str) and isinstance(ts, (int, float)) and time.time() - ts < ttl:
+            return version
+
+    version = fetcher()
+    cache[key] = {"version": version, "ts": time.time()}
+    return version
+
+
+def _file_key(file_path: Path) -> str:
+    # The cache file is shared by every clone and worktree on the machine, so
+    # key entries by absolute path rather than by path within the repo.
+    return f"file:{file_path.resolve()}"
+
+
+def _file_unchanged(cache: Dict[str, Dict[str, object]], file_path: Path, version: object) -> bool:
+    """True if *file_path* still matches the stat recorded after pinning *version*."""
+    entry = cache.get(_file_key(file_path))
+    if not isinstance(entry, dict) or entry.get("version") != version:
+        return False
+    try:
+        st = file_path.stat()
+    except OSError:
+        return False
+    return entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size
+
+
+def _remember_file(cache: Dict[str, Dict[str, object]], file_path: Path, version: object) -> None:
+    st = file_path.stat()
+    cache[_file_key(file_path)] = {
+        "version": version,
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Template discovery
+# ---------------------------------------------------------------------------
+
+def _iter_template_files(root: Path, subdir: str, filename: str) -> Iterator[Path]:
+    """Yield ``root/subdir/*/filename`` for every template that has that file."""
+    try:
+        entries = os.scandir(root / subdir)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            candidate = os.path.join(entry.path, filename)
+            if os.path.isfile(candidate):
+                yield Path(candidate)
+
+
 # ---------------------------------------------------------------------------
 # Updaters
 # ---------------------------------------------------------------------------
 
-_KERN_DEP_REGEX = re.compile(r"(\"kernel)([^\"]*)(\")")
+def _loads_json(raw: bytes) -> dict:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _write_json(file_path: Path, data: dict) -> None:
+    """Write *data* as 2-space indented UTF-8 JSON with a trailing newline."""
+    with file_path.open("wb") as f:
+        if orjson is not None:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+        else:
+            f.write(json.dumps(data, indent=2, ensure_ascii=False).encode())
+            f.write(b"\n")
 
 
-def _update_pyproject(file_path: Path, new_version: str) -> bool:
+# Python dependencies pinned by this script, mapped to the pattern matching any
+# existing constraint on them, e.g. "kernel>=0.8.0", "kernel==0.5.0", "kernel~=0.7".
+_PY_DEP_PATTERNS: Dict[str, str] = {
+    "kernel": r'"kernel[<>=~!0-9.]*"',
+}
+_PY_DEP_NAMES = list(_PY_DEP_PATTERNS)
+# A single alternation so one scan rewrites every dependency in the file. The
+# patterns are pure ASCII, so match on raw bytes and skip the UTF-8 round-trip.
+_PY_DEPS_REGEX = re.compile(
+    "|".join(f"(?P<d{i}>{pattern})" for i, pattern in enumerate(_PY_DEP_PATTERNS.values())).encode()
+)
+
+
+def _update_pyproject(file_path: Path, versions: Dict[str, str]) -> bool:
     """Return True if file changed."""
-    text = file_path.read_text()
+    text = file_path.read_bytes()
+
+    # Fast path: each dependency appears exactly once and already carries the
+    # target constraint, so a substring check suffices and the regex never runs.
+    if all(
+        text.count(f'"{name}'.encode()) == 1 and f'"{name}>={version}"'.encode() in text
+        for name, version in versions.items()
+    ):
+        return False
+
+    def _replace(match: re.Match) -> bytes:
+        name = _PY_DEP_NAMES[int(match.lastgroup[1:])]
+        version = versions.get(name)
+        return f'"{name}>={version}"'.encode() if version else match.group(0)
 
-    # Replace any appearance like "kernel>=0.8.0", "kernel==0.5.0", "kernel~=0.7"
-    new_constraint = f'"kernel>={new_version}"'
-    new_text = re.sub(r'"kernel[<>=~!0-9.]*"', new_constraint, text)
+    new_text, n = _PY_DEPS_REGEX.subn(_replace, text)
 
-    if new_text != text:
-        file_path.write_text(new_text)
+    if n and new_text != text:
+        file_path.write_bytes(new_text)
         return True
     return False
 
 
 def _update_package_json(file_path: Path, new_version: str) -> bool:
-    data = json.loads(file_path.read_text())
+    raw = file_path.read_bytes()
+
+    # Fast path: the only SDK entry already pins the target version, so there
+    # is nothing to parse or rewrite.
+    target = f'"@onkernel/sdk": ">={new_version}"'.encode()
+    if raw.count(b'"@onkernel/sdk"') == 1 and target in raw:
+        return False
+
+    data = _loads_json(raw)
     changed = False
 
     for section in ("dependencies", "peerDependencies" , "devDependencies"):
@@ -91,7 +268,7 @@ def _update_package_json(file_path: Path, new_version: str) -> bool:
                 changed = True
 
     if changed:
-        file_path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n")
+        _write_json(file_path, data)
     return changed
 
 
@@ -100,23 +277,50 @@ def _update_package_json(file_path: Path, new_version: str) -> bool:
 # ---------------------------------------------------------------------------
 
 def main() -> None:
-    latest_kernel = _get_latest_pypi_version("kernel")
-    latest_sdk = _get_latest_npm_version("@onkernel/sdk")
+    parser = argparse.ArgumentParser(description="Bump Kernel SDK versions in templates.")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="neither read nor update the on-disk version cache; always query the registries",
+    )
+    args = parser.parse_args()
+
+    cache: Dict[str, Dict[str, object]] = {} if args.no_cache else _load_cache()
+
+    # The two registry lookups are independent, so run them concurrently.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        kernel_future = pool.submit(
+            _cached_latest, cache, "pypi:kernel", lambda: _get_latest_pypi_version("kernel")
+        )
+        sdk_future = pool.submit(
+            _cached_latest, cache, "npm:@onkernel/sdk", lambda: _get_latest_npm_version("@onkernel/sdk")
+        )
+        latest_kernel = kernel_future.result()
+        latest_sdk = sdk_future.result()
 
     print(f"Latest kernel version on PyPI: {latest_kernel}")
     print(f"Latest @onkernel/sdk version on npm: {latest_sdk}")
 
     modified_files: List[Path] = []
 
-    # Python templates
-    for file_path in REPO_ROOT.glob("templates/python/*/pyproject.toml"):
-        if _update_pyproject(file_path, latest_kernel):
+    # Templates whose stat matches what we recorded after the last run for the
+    # same version are skipped without being read.
+    targets = [
+        (file_path, _update_pyproject, {"kernel": latest_kernel})
+        for file_path in _iter_template_files(REPO_ROOT, "templates/python", "pyproject.toml")
+    ] + [
+        (file_path, _update_package_json, latest_sdk)
+        for file_path in _iter_template_files(REPO_ROOT, "templates/typescript", "package.json")
+    ]
+    for file_path, update, version in targets:
+        if _file_unchanged(cache, file_path, version):
+            continue
+        if update(file_path, version):
             modified_files.append(file_path.relative_to(REPO_ROOT))
+        _remember_file(cache, file_path, version)
 
-    # Typescript templates
-    for file_path in REPO_ROOT.glob("templates/typescript/*/package.json"):
-        if _update_package_json(file_path, latest_sdk):
-            modified_files.append(file_path.relative_to(REPO_ROOT))
+    if not args.no_cache:
+        _save_cache(cache)
 
     if modified_files:
         print("Updated the following files:")
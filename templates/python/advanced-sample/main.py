@@ -1,3 +1,6 @@
+import asyncio
+import os
+
 import kernel
 from kernel import Kernel
 from playwright.async_api import async_playwright
@@ -9,6 +12,9 @@ app = kernel.App("python-advanced")
 Example showing Kernel's auto-CAPTCHA solver.
 Visit the live view url to see the Kernel browser auto-solve the CAPTCHA on the site.
 
+Set KERNEL_DEMO_DELAY_MS (e.g. 10000) when deploying to pause before navigating,
+giving you time to open the live view url. Defaults to no delay.
+
 Args:
     ctx: Kernel context containing invocation information
 Returns:
@@ -22,7 +28,8 @@ Invoke this via CLI:
 """
 @app.action("test-captcha-solver")
 async def test_captcha_solver(ctx: kernel.KernelContext) -> None:
-    kernel_browser = client.browsers.create(
+    kernel_browser = await asyncio.to_thread(
+        client.browsers.create,
         invocation_id=ctx.invocation_id,
         stealth=True,
     )
@@ -41,7 +48,10 @@ async def test_captcha_solver(ctx: kernel.KernelContext) -> None:
         
         # Navigate to a site with a CAPTCHA
         try:
-            await page.wait_for_timeout(10000)  # Add a delay to give you time to visit the live view url
+            # Optional delay to give you time to visit the live view url
+            delay_ms = int(os.environ.get("KERNEL_DEMO_DELAY_MS", "0"))
+            if delay_ms > 0:
+                await page.wait_for_timeout(delay_ms)
             await page.goto("https://www.google.com/recaptcha/api2/demo")
         except Exception as e:
             print(f"Error during navigation: {e}")
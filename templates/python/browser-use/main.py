@@ -1,3 +1,6 @@
+import asyncio
+import functools
+
 from browser_use.llm import ChatOpenAI
 from browser_use import Agent, Browser
 import kernel
@@ -5,7 +8,9 @@ from kernel import Kernel
 from typing import TypedDict
 from session import BrowserSessionCustomResize
 
-client = Kernel()
+@functools.cache
+def _client() -> Kernel:
+    return Kernel()
 
 app = kernel.App("python-bu")
 
@@ -14,7 +19,9 @@ class TaskInput(TypedDict):
     
 # LLM API Keys are set in the environment during `kernel deploy <filename> -e OPENAI_API_KEY=XXX`
 # See https://onkernel.com/docs/launch/deploy#environment-variables
-llm = ChatOpenAI(model="gpt-4.1")
+@functools.cache
+def _llm() -> ChatOpenAI:
+    return ChatOpenAI(model="gpt-4.1")
 
 @app.action("bu-task")
 async def bu_task(ctx: kernel.KernelContext, input_data: TaskInput):
@@ -29,7 +36,9 @@ async def bu_task(ctx: kernel.KernelContext, input_data: TaskInput):
         An object with final_result and errors properties
     """
     
-    kernel_browser = client.browsers.create(invocation_id=ctx.invocation_id, stealth=True)
+    kernel_browser = await asyncio.to_thread(
+        _client().browsers.create, invocation_id=ctx.invocation_id, stealth=True
+    )
     print("Kernel browser live view url: ", kernel_browser.browser_live_view_url)
     #######################################
     # Your Browser Use implementation here
@@ -46,7 +55,7 @@ async def bu_task(ctx: kernel.KernelContext, input_data: TaskInput):
     agent = Agent(
         #task="Compare the price of gpt-4o and DeepSeek-V3",
         task=input_data["task"],
-        llm=llm,
+        llm=_llm(),
         # browser_session=BrowserSessionCustomResize(cdp_url=kernel_browser.cdp_ws_url)
         browser_session=browser
     )
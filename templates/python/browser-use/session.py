@@ -1,7 +1,12 @@
 # This file may be needed to help resize the browser session for projects using browser-use versions < 0.7.9
 
+import asyncio
+import logging
+
 from browser_use import BrowserSession
 
+logger = logging.getLogger(__name__)
+
 # Define a subclass of BrowserSession that overrides _setup_viewports (which mishandles resizeing on connecting via cdp)
 class BrowserSessionCustomResize(BrowserSession):
     async def _setup_viewports(self) -> None:
@@ -21,40 +26,40 @@ class BrowserSessionCustomResize(BrowserSession):
             try:
                 await self.browser_context.grant_permissions(self.browser_profile.permissions)
             except Exception as e:
-                print(e)
+                logger.warning(e)
         try:
             if self.browser_profile.default_timeout:
                 self.browser_context.set_default_timeout(self.browser_profile.default_timeout)
             if self.browser_profile.default_navigation_timeout:
                 self.browser_context.set_default_navigation_timeout(self.browser_profile.default_navigation_timeout)
         except Exception as e:
-            print(e)
+            logger.warning(e)
         try:
             if self.browser_profile.extra_http_headers:
                 self.browser_context.set_extra_http_headers(self.browser_profile.extra_http_headers)
         except Exception as e:
-            print(e)
+            logger.warning(e)
 
         try:
             if self.browser_profile.geolocation:
                 await self.browser_context.set_geolocation(self.browser_profile.geolocation)
         except Exception as e:
-            print(e)
+            logger.warning(e)
 
         await self.load_storage_state()
 
-        page = None
+        pages = list(self.browser_context.pages)
 
-        for page in self.browser_context.pages:
-            # apply viewport size settings to any existing pages
-            if viewport:
-                await page.set_viewport_size(viewport)
+        # apply viewport size settings to any existing pages; each call is an independent CDP round-trip
+        if viewport:
+            await asyncio.gather(*(page.set_viewport_size(viewport) for page in pages))
 
-            # show browser-use dvd screensaver-style bouncing loading animation on any about:blank pages
-            if page.url == 'about:blank':
-                await self._show_dvd_screensaver_loading_animation(page)
+        # show browser-use dvd screensaver-style bouncing loading animation on any about:blank pages
+        await asyncio.gather(
+            *(self._show_dvd_screensaver_loading_animation(page) for page in pages if page.url == 'about:blank')
+        )
 
-        page = page or (await self.browser_context.new_page())
+        page = pages[-1] if pages else (await self.browser_context.new_page())
 
         if (not viewport) and (self.browser_profile.window_size is not None) and not self.browser_profile.headless:
             # attempt to resize the actual browser window
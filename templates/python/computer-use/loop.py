@@ -3,9 +3,12 @@ Agentic sampling loop that calls the Anthropic API and local implementation of a
 From https://github.com/anthropics/anthropic-quickstarts/blob/main/computer-use-demo/computer_use_demo/loop.py
 """
 
+import asyncio
+import binascii
+import logging
 import os
 import platform
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from datetime import datetime
 from enum import StrEnum
 from typing import Any, cast
@@ -13,12 +16,13 @@ from playwright.async_api import Page
 
 import httpx
 from anthropic import (
-    Anthropic,
     AnthropicBedrock,
     AnthropicVertex,
     APIError,
     APIResponseValidationError,
     APIStatusError,
+    AsyncAnthropic,
+    DefaultAsyncHttpxClient,
 )
 from anthropic.types.beta import (
     BetaCacheControlEphemeralParam,
@@ -26,7 +30,6 @@ from anthropic.types.beta import (
     BetaImageBlockParam,
     BetaMessage,
     BetaMessageParam,
-    BetaTextBlock,
     BetaTextBlockParam,
     BetaToolResultBlockParam,
     BetaToolUseBlockParam,
@@ -39,20 +42,37 @@ from tools import (
     ToolVersion,
 )
 
+logger = logging.getLogger(__name__)
+
 PROMPT_CACHING_BETA_FLAG = "prompt-caching-2024-07-31"
+EXTENDED_CACHE_TTL_BETA_FLAG = "extended-cache-ttl-2025-04-11"
+
+# Tool definitions and the system prompt never change during a run, so cache them
+# for an hour; the conversation tail keeps the default 5-minute breakpoints.
+LONG_LIVED_CACHE_CONTROL = {"type": "ephemeral", "ttl": "1h"}
+
+# Computer actions that only observe the page and can safely run concurrently.
+# Everything else mutates shared page state and runs in the order issued.
+PARALLEL_SAFE_ACTIONS = frozenset({"screenshot", "cursor_position"})
 
 
 class APIProvider(StrEnum):
     ANTHROPIC = "anthropic"
 
 
+_ARCH = os.uname().machine
+
+
+def _b64encode(data: bytes) -> str:
+    return binascii.b2a_base64(data, newline=False).decode("ascii")
+
 # This system prompt is optimized for the Docker environment in this repository and
 # specific tool combinations enabled.
 # We encourage modifying this system prompt to ensure the model has context for the
 # environment it is running in, and to provide any additional information that may be
 # helpful for the task at hand.
 SYSTEM_PROMPT = f"""<SYSTEM_CAPABILITY>
-* You are utilising an Ubuntu virtual machine using {os.uname().machine} architecture with internet access.
+* You are utilising an Ubuntu virtual machine using {_ARCH} architecture with internet access.
 * When you connect to the display, CHROMIUM IS ALREADY OPEN. The url bar is not visible but it is there.
 * If you need to navigate to a new page, use ctrl+l to focus the url bar and then enter the url.
 * You won't be able to see the url bar from the screenshot but ctrl-l still works.
@@ -61,7 +81,6 @@ SYSTEM_PROMPT = f"""<SYSTEM_CAPABILITY>
 * Either that, or make sure you scroll down to see everything before deciding something isn't available.
 * When using your computer function calls, they take a while to run and send back to you.
 * Where possible/feasible, try to chain multiple of these calls all into one function calls request.
-* The current date is {datetime.now().strftime("%A, %B %d, %Y")}.
 * After each step, take a screenshot and carefully evaluate if you have achieved the right outcome.
 * Explicitly show your thinking: "I have evaluated step X..." If not correct, try again.
 * Only when you confirm a step was executed correctly should you move on to the next one.
@@ -73,6 +92,12 @@ SYSTEM_PROMPT = f"""<SYSTEM_CAPABILITY>
 </IMPORTANT>"""
 
 
+def _current_date_prompt() -> str:
+    # Kept out of SYSTEM_PROMPT so the cached prompt prefix stays byte-identical
+    # across days and processes.
+    return f"The current date is {datetime.now().strftime('%A, %B %d, %Y')}."
+
+
 async def sampling_loop(
     *,
     model: str,
@@ -85,6 +110,7 @@ async def sampling_loop(
     tool_version: ToolVersion = "computer_use_20250124",
     thinking_budget: int | None = None,
     token_efficient_tools_beta: bool = False,
+    tool_concurrency_limit: int = 4,
     playwright_page: Page,
 ):
     """
@@ -101,6 +127,7 @@ async def sampling_loop(
         tool_version: Version of tools to use (defaults to V20250124)
         thinking_budget: Optional token budget for thinking
         token_efficient_tools_beta: Whether to use token efficient tools beta
+        tool_concurrency_limit: Maximum number of read-only tool calls run at once (defaults to 4)
         playwright_page: The Playwright page instance for browser automation
     """
     tool_group = TOOL_GROUPS_BY_VERSION[tool_version]
@@ -114,88 +141,206 @@ async def sampling_loop(
         type="text",
         text=f"{SYSTEM_PROMPT}{' ' + system_prompt_suffix if system_prompt_suffix else ''}",
     )
+    date_block = BetaTextBlockParam(type="text", text=_current_date_prompt())
+    # The tool set is fixed for the whole loop; build its params once so every
+    # request sends a byte-identical (and therefore cacheable) tools prefix.
+    tool_params = tool_collection.to_params()
+    # Shared by calls started while streaming and those run after the turn, so
+    # tool_concurrency_limit bounds both.
+    tool_semaphore = asyncio.Semaphore(max(1, tool_concurrency_limit))
+    # Use the async client so the event loop (and Playwright) isn't blocked while
+    # waiting on the model, and build it once so its connection pool is reused.
+    client = AsyncAnthropic(
+        api_key=api_key,
+        max_retries=4,
+        timeout=httpx.Timeout(connect=5, read=120, write=30, pool=5),
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+        ),
+    )
+
+    # Everything below is fixed for the whole loop, so set it up once; the
+    # system and tools blocks then stay identical across turns.
+    betas = [tool_group.beta_flag] if tool_group.beta_flag else []
+    if token_efficient_tools_beta:
+        betas.append("token-efficient-tools-2025-02-19")
+    image_truncation_threshold = only_n_most_recent_images or 0
+    enable_prompt_caching = True
+
+    if enable_prompt_caching:
+        betas.append(PROMPT_CACHING_BETA_FLAG)
+        betas.append(EXTENDED_CACHE_TTL_BETA_FLAG)
+        # Copy before tagging: tools hand out their cached params dict
+        tool_params[-1] = {**tool_params[-1], "cache_control": LONG_LIVED_CACHE_CONTROL}  # type: ignore
+        # Because cached reads are 10% of the price, we don't think it's
+        # ever sensible to break the cache by truncating images
+        only_n_most_recent_images = 0
+        # Use type ignore to bypass TypedDict check until SDK types are updated
+        system["cache_control"] = LONG_LIVED_CACHE_CONTROL  # type: ignore
+
+    extra_body = {}
+    if thinking_budget:
+        # Ensure we only send the required fields for thinking
+        extra_body = {
+            "thinking": {"type": "enabled", "budget_tokens": thinking_budget}
+        }
+
+    # Read-only tool calls started while the current response streams. Any
+    # still running when the loop exits (end_turn, errors) are cancelled in the
+    # finally below, which also releases the client's HTTP connection pool.
+    early_results: dict[str, asyncio.Task[ToolResult]] = {}
+    try:
+        while True:
+            if enable_prompt_caching:
+                _inject_prompt_caching(messages)
+
+            if only_n_most_recent_images:
+                _maybe_filter_to_n_most_recent_images(
+                    messages,
+                    only_n_most_recent_images,
+                    min_removal_threshold=image_truncation_threshold,
+                )
 
-    while True:
-        enable_prompt_caching = False
-        betas = [tool_group.beta_flag] if tool_group.beta_flag else []
-        if token_efficient_tools_beta:
-            betas.append("token-efficient-tools-2025-02-19")
-        image_truncation_threshold = only_n_most_recent_images or 0
-        client = Anthropic(api_key=api_key, max_retries=4)
-        enable_prompt_caching = True
-
-        if enable_prompt_caching:
-            betas.append(PROMPT_CACHING_BETA_FLAG)
-            _inject_prompt_caching(messages)
-            # Because cached reads are 10% of the price, we don't think it's
-            # ever sensible to break the cache by truncating images
-            only_n_most_recent_images = 0
-            # Use type ignore to bypass TypedDict check until SDK types are updated
-            system["cache_control"] = {"type": "ephemeral"}  # type: ignore
-
-        if only_n_most_recent_images:
-            _maybe_filter_to_n_most_recent_images(
-                messages,
-                only_n_most_recent_images,
-                min_removal_threshold=image_truncation_threshold,
+            # Call the API
+            async with client.beta.messages.stream(
+                max_tokens=max_tokens,
+                messages=messages,
+                model=model,
+                system=[system, date_block],
+                tools=tool_params,
+                betas=betas,
+                extra_body=extra_body,
+            ) as stream:
+                # Start read-only tool calls as soon as their block finishes streaming,
+                # overlapping them with the rest of generation. Once a page-mutating
+                # call appears, later calls wait so they observe its effects.
+                early_results = {}
+                can_dispatch_early = True
+                async for event in stream:
+                    if event.type != "content_block_stop" or event.content_block.type != "tool_use":
+                        continue
+                    block = event.content_block
+                    if can_dispatch_early and _is_parallel_safe(block.input):
+                        early_results[block.id] = asyncio.create_task(
+                            _run_tool(
+                                tool_collection,
+                                tool_semaphore,
+                                block.name,
+                                cast(dict[str, Any], block.input),
+                            )
+                        )
+                    else:
+                        can_dispatch_early = False
+                response = await stream.get_final_message()
+
+            response_params = _response_to_params(response)
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": response_params,
+                }
             )
-        extra_body = {}
-        if thinking_budget:
-            # Ensure we only send the required fields for thinking
-            extra_body = {
-                "thinking": {"type": "enabled", "budget_tokens": thinking_budget}
-            }
 
-        # Call the API
-        response = client.beta.messages.create(
-            max_tokens=max_tokens,
-            messages=messages,
-            model=model,
-            system=[system],
-            tools=tool_collection.to_params(),
-            betas=betas,
-            extra_body=extra_body,
-        )
+            if logger.isEnabledFor(logging.DEBUG):
+                loggable_content = [
+                    {
+                        "text": block.get("text", "") or block.get("thinking", ""),
+                        "input": block.get("input", ""),
+                    }
+                    for block in response_params
+                ]
+                logger.debug(
+                    "LLM response (stop reason: %s): %s",
+                    response.stop_reason,
+                    loggable_content,
+                )
 
-        response_params = _response_to_params(response)
-        messages.append(
-            {
-                "role": "assistant",
-                "content": response_params,
-            }
-        )
+            if response.stop_reason == "end_turn":
+                print("LLM has completed its task, ending loop")
+                return messages
+
+            tool_use_blocks = [
+                cast(BetaToolUseBlockParam, content_block)
+                for content_block in response_params
+                if content_block["type"] == "tool_use"
+            ]
+            results = await _run_tool_uses(
+                tool_collection, tool_use_blocks, tool_semaphore, early_results
+            )
+            tool_result_content: list[BetaToolResultBlockParam] = [
+                _make_api_tool_result(result, content_block["id"])
+                for content_block, result in zip(tool_use_blocks, results)
+            ]
 
-        loggable_content = [
-            {
-                "text": block.get("text", "") or block.get("thinking", ""),
-                "input": block.get("input", ""),
-            }
-            for block in response_params
-        ]
-        print("=== LLM RESPONSE ===")
-        print("Stop reason:", response.stop_reason)
-        print(loggable_content)
-        print("===")
-
-        if response.stop_reason == "end_turn":
-            print("LLM has completed its task, ending loop")
-            return messages
-
-        tool_result_content: list[BetaToolResultBlockParam] = []
-        for content_block in response_params:
-            if content_block["type"] == "tool_use":
-                result = await tool_collection.run(
-                    name=content_block["name"],
-                    tool_input=cast(dict[str, Any], content_block["input"]),
-                )
-                tool_result_content.append(
-                    _make_api_tool_result(result, content_block["id"])
-                )
+            if not tool_result_content:
+                return messages
+
+            messages.append({"content": tool_result_content, "role": "user"})
+    finally:
+        await _cancel_tasks(early_results.values())
+        await client.close()
+
+
+async def _cancel_tasks(tasks: Iterable[asyncio.Task[Any]]) -> None:
+    """Cancel any of `tasks` still running and wait for all of them to finish."""
+    tasks = list(tasks)
+    for task in tasks:
+        task.cancel()
+    # return_exceptions also retrieves errors from tasks that already failed
+    await asyncio.gather(*tasks, return_exceptions=True)
 
-        if not tool_result_content:
-            return messages
 
-        messages.append({"content": tool_result_content, "role": "user"})
+def _is_parallel_safe(tool_input: object) -> bool:
+    return isinstance(tool_input, dict) and tool_input.get("action") in PARALLEL_SAFE_ACTIONS
+
+
+async def _run_tool(
+    tool_collection: ToolCollection,
+    semaphore: asyncio.Semaphore,
+    name: str,
+    tool_input: dict[str, Any],
+) -> ToolResult:
+    async with semaphore:
+        return await tool_collection.run(name=name, tool_input=tool_input)
+
+
+async def _run_tool_uses(
+    tool_collection: ToolCollection,
+    tool_use_blocks: list[BetaToolUseBlockParam],
+    semaphore: asyncio.Semaphore,
+    started: dict[str, asyncio.Task[ToolResult]] | None = None,
+) -> list[ToolResult]:
+    """
+    Run tool_use blocks and return their results in the order they were issued.
+    Consecutive read-only calls are dispatched together, bounded by
+    `semaphore`; calls that mutate the page run one at a time.
+    Blocks whose id is in `started` were already dispatched while streaming.
+    """
+    started = started or {}
+
+    async def run(block: BetaToolUseBlockParam) -> ToolResult:
+        if block["id"] in started:
+            return await started[block["id"]]
+        return await _run_tool(
+            tool_collection,
+            semaphore,
+            block["name"],
+            cast(dict[str, Any], block["input"]),
+        )
+
+    results: list[ToolResult] = []
+    batch: list[BetaToolUseBlockParam] = []
+    for block in tool_use_blocks:
+        if _is_parallel_safe(block["input"]):
+            batch.append(block)
+            continue
+        if batch:
+            results.extend(await asyncio.gather(*(run(b) for b in batch)))
+            batch = []
+        results.append(await run(block))
+    if batch:
+        results.extend(await asyncio.gather(*(run(b) for b in batch)))
+    return results
 
 
 def _maybe_filter_to_n_most_recent_images(
@@ -212,39 +357,39 @@ def _maybe_filter_to_n_most_recent_images(
     if images_to_keep is None:
         return messages
 
-    tool_result_blocks = cast(
-        list[BetaToolResultBlockParam],
-        [
-            item
-            for message in messages
-            for item in (
-                message["content"] if isinstance(message["content"], list) else []
-            )
-            if isinstance(item, dict) and item.get("type") == "tool_result"
-        ],
-    )
-
-    total_images = sum(
-        1
-        for tool_result in tool_result_blocks
-        for content in tool_result.get("content", [])
-        if isinstance(content, dict) and content.get("type") == "image"
-    )
-
-    images_to_remove = total_images - images_to_keep
+    # Walk newest to oldest, keeping the first `images_to_keep` images seen and
+    # recording the location of every older one.
+    kept = 0
+    older_images: list[tuple[list, int]] = []
+    for message in reversed(messages):
+        content = message["content"]
+        if not isinstance(content, list):
+            continue
+        for item in reversed(content):
+            if not (isinstance(item, dict) and item.get("type") == "tool_result"):
+                continue
+            tool_result_content = item.get("content")
+            if not isinstance(tool_result_content, list):
+                continue
+            for index in range(len(tool_result_content) - 1, -1, -1):
+                block = tool_result_content[index]
+                if isinstance(block, dict) and block.get("type") == "image":
+                    if kept < images_to_keep:
+                        kept += 1
+                    else:
+                        older_images.append((tool_result_content, index))
+
+    images_to_remove = len(older_images)
     # for better cache behavior, we want to remove in chunks
-    images_to_remove -= images_to_remove % min_removal_threshold
-
-    for tool_result in tool_result_blocks:
-        if isinstance(tool_result.get("content"), list):
-            new_content = []
-            for content in tool_result.get("content", []):
-                if isinstance(content, dict) and content.get("type") == "image":
-                    if images_to_remove > 0:
-                        images_to_remove -= 1
-                        continue
-                new_content.append(content)
-            tool_result["content"] = new_content
+    if min_removal_threshold:
+        images_to_remove -= images_to_remove % min_removal_threshold
+    if images_to_remove <= 0:
+        return
+
+    # older_images is ordered newest first, so the oldest ones are at the tail;
+    # within a list they appear in descending index order, keeping deletes valid.
+    for tool_result_content, index in older_images[len(older_images) - images_to_remove :]:
+        del tool_result_content[index]
 
 
 def _response_to_params(
@@ -252,21 +397,32 @@ def _response_to_params(
 ) -> list[BetaContentBlockParam]:
     res: list[BetaContentBlockParam] = []
     for block in response.content:
-        if isinstance(block, BetaTextBlock):
+        block_type = block.type
+        if block_type == "text":
             if block.text:
-                res.append(BetaTextBlockParam(type="text", text=block.text))
-            elif getattr(block, "type", None) == "thinking":
-                # Handle thinking blocks - include signature field
-                thinking_block = {
+                res.append({"type": "text", "text": block.text})
+        elif block_type == "tool_use":
+            # Build the param directly rather than going through Pydantic's serializer
+            res.append(
+                {
+                    "type": "tool_use",
+                    "id": block.id,
+                    "name": block.name,
+                    "input": block.input,
+                }
+            )
+        elif block_type == "thinking":
+            res.append(
+                {
                     "type": "thinking",
-                    "thinking": getattr(block, "thinking", None),
+                    "thinking": block.thinking,
+                    "signature": block.signature,
                 }
-                if hasattr(block, "signature"):
-                    thinking_block["signature"] = getattr(block, "signature", None)
-                res.append(cast(BetaContentBlockParam, thinking_block))
+            )
+        elif block_type == "redacted_thinking":
+            res.append({"type": "redacted_thinking", "data": block.data})
         else:
-            # Handle tool use blocks normally
-            res.append(cast(BetaToolUseBlockParam, block.model_dump()))
+            res.append(cast(BetaContentBlockParam, block.model_dump()))
     return res
 
 
@@ -274,11 +430,12 @@ def _inject_prompt_caching(
     messages: list[BetaMessageParam],
 ):
     """
-    Set cache breakpoints for the 3 most recent turns
-    one cache breakpoint is left for tools/system prompt, to be shared across sessions
+    Set cache breakpoints for the 2 most recent turns
+    the other two breakpoints (of the 4 allowed) are used by the tools and system prompt,
+    to be shared across sessions
     """
 
-    breakpoints_remaining = 3
+    breakpoints_remaining = 2
     for message in reversed(messages):
         if message["role"] == "user" and isinstance(
             content := message["content"], list
@@ -299,39 +456,47 @@ def _make_api_tool_result(
     result: ToolResult, tool_use_id: str
 ) -> BetaToolResultBlockParam:
     """Convert an agent ToolResult to an API ToolResultBlockParam."""
-    tool_result_content: list[BetaTextBlockParam | BetaImageBlockParam] | str = []
-    is_error = False
     if result.error:
-        is_error = True
-        tool_result_content = _maybe_prepend_system_tool_result(result, result.error)
-    else:
-        if result.output:
-            tool_result_content.append(
-                {
-                    "type": "text",
-                    "text": _maybe_prepend_system_tool_result(result, result.output),
-                }
-            )
-        if result.base64_image:
-            tool_result_content.append(
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": "image/png",
-                        "data": result.base64_image,
-                    },
-                }
-            )
+        return {
+            "type": "tool_result",
+            "content": _maybe_prepend_system_tool_result(result, result.error),
+            "tool_use_id": tool_use_id,
+            "is_error": True,
+        }
+
+    tool_result_content: list[BetaTextBlockParam | BetaImageBlockParam] = []
+    if result.output:
+        tool_result_content.append(
+            {
+                "type": "text",
+                "text": _maybe_prepend_system_tool_result(result, result.output),
+            }
+        )
+    if result.image:
+        # Screenshots travel through the tools as raw bytes and are encoded
+        # exactly once, here at the API boundary.
+        tool_result_content.append(
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    # Screenshots are JPEG or PNG depending on the tool's settings
+                    "media_type": "image/jpeg"
+                    if result.image.startswith(b"\xff\xd8")
+                    else "image/png",
+                    "data": _b64encode(result.image),
+                },
+            }
+        )
     return {
         "type": "tool_result",
         "content": tool_result_content,
         "tool_use_id": tool_use_id,
-        "is_error": is_error,
+        "is_error": False,
     }
 
 
 def _maybe_prepend_system_tool_result(result: ToolResult, result_text: str):
     if result.system:
-        result_text = f"<system>{result.system}</system>\n{result_text}"
+        return result.system_prefix + result_text
     return result_text
\ No newline at end of file
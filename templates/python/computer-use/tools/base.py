@@ -1,11 +1,16 @@
 """
 From https://github.com/anthropics/anthropic-quickstarts/blob/main/computer-use-demo/computer_use_demo/tools/base.py
 """
+
+from __future__ import annotations
+
 from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass, fields, replace
-from typing import Any
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
 
-from anthropic.types.beta import BetaToolUnionParam
+if TYPE_CHECKING:
+    from anthropic.types.beta import BetaToolUnionParam
 
 
 class BaseAnthropicTool(metaclass=ABCMeta):
@@ -29,9 +34,14 @@ class ToolResult:
 
     output: str | None = None
     error: str | None = None
-    base64_image: str | None = None
+    image: bytes | None = None
     system: str | None = None
 
+    @cached_property
+    def system_prefix(self) -> str:
+        """The system message wrapped in tags, ready to prepend to tool output."""
+        return f"<system>{self.system}</system>\n" if self.system else ""
+
     def __bool__(self):
         return any(getattr(self, field.name) for field in fields(self))
 
@@ -48,7 +58,7 @@ class ToolResult:
         return ToolResult(
             output=combine_fields(self.output, other.output),
             error=combine_fields(self.error, other.error),
-            base64_image=combine_fields(self.base64_image, other.base64_image, False),
+            image=combine_fields(self.image, other.image, False),
             system=combine_fields(self.system, other.system),
         )
 
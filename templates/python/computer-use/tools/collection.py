@@ -3,9 +3,12 @@ Collection classes for managing multiple tools.
 From https://github.com/anthropics/anthropic-quickstarts/blob/main/computer-use-demo/computer_use_demo/tools/collection.py
 """
 
-from typing import Any
+from __future__ import annotations
 
-from anthropic.types.beta import BetaToolUnionParam
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from anthropic.types.beta import BetaToolUnionParam
 
 from .base import (
     BaseAnthropicTool,
@@ -18,9 +21,15 @@ from .base import (
 class ToolCollection:
     """A collection of anthropic-defined tools."""
 
+    __slots__ = ("tools", "tool_map")
+
     def __init__(self, *tools: BaseAnthropicTool):
         self.tools = tools
-        self.tool_map = {tool.to_params()["name"]: tool for tool in tools}
+        # Tools carry their name as an attribute; only build params for ones that don't
+        self.tool_map = {
+            (getattr(tool, "name", None) or tool.to_params()["name"]): tool
+            for tool in tools
+        }
 
     def to_params(
         self,
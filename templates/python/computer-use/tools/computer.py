@@ -3,18 +3,25 @@ Modified from https://github.com/anthropics/anthropic-quickstarts/blob/main/comp
 Replaces xdotool and gnome-screenshot with Playwright.
 """
 
+from __future__ import annotations
+
 import asyncio
-import base64
+import logging
 import os
+from collections.abc import Awaitable, Callable, Iterator
 from enum import StrEnum
-from typing import Literal, TypedDict, cast, get_args
+from functools import cached_property, lru_cache
+from typing import TYPE_CHECKING, Literal, TypedDict, cast, get_args
 
 from playwright.async_api import Page
 
-from anthropic.types.beta import BetaToolComputerUse20241022Param, BetaToolUnionParam
+if TYPE_CHECKING:
+    from anthropic.types.beta import BetaToolComputerUse20241022Param, BetaToolUnionParam
 
 from .base import BaseAnthropicTool, ToolError, ToolResult
 
+logger = logging.getLogger(__name__)
+
 TYPING_DELAY_MS = 12
 TYPING_GROUP_SIZE = 50
 
@@ -65,6 +72,28 @@ KEY_MAP = {
     'plus': '+',
 }
 
+# Single casefolded lookup covering both maps, so map_key does one normalisation
+# and one dict probe per key
+_KEY_LOOKUP = {k.casefold(): v for k, v in {**KEY_MAP, **MODIFIER_KEY_MAP}.items()}
+
+
+# Pure over the constant maps above, and a session only sees a handful of
+# distinct keys, so results are memoised
+@lru_cache(maxsize=512)
+def _map_key(key: str) -> str:
+    # Handle modifier and special keys
+    mapped = _KEY_LOOKUP.get(key.casefold())
+    if mapped is not None:
+        return mapped
+
+    # Handle key combinations (e.g. "ctrl+a", "ctrl+shift+t")
+    if '+' in key:
+        return '+'.join(_KEY_LOOKUP.get(part.casefold(), part) for part in key.split('+'))
+
+    # Return the key as is if no mapping exists
+    return key
+
+
 Action_20241022 = Literal[
     "key",
     "type",
@@ -91,9 +120,10 @@ Action_20250124 = (
 )
 
 ScrollDirection = Literal["up", "down", "left", "right"]
+_SCROLL_DIRECTIONS: frozenset[str] = frozenset(get_args(ScrollDirection))
 
 # Map Playwright mouse buttons to our actions
-MOUSE_BUTTONS = {
+MOUSE_BUTTONS: dict[str, Literal["left", "right", "middle"]] = {
     "left_click": "left",
     "right_click": "right",
     "middle_click": "middle",
@@ -104,8 +134,8 @@ class ComputerToolOptions(TypedDict):
     display_width_px: int
     display_number: int | None
 
-def chunks(s: str, chunk_size: int) -> list[str]:
-    return [s[i : i + chunk_size] for i in range(0, len(s), chunk_size)]
+def chunks(s: str, chunk_size: int) -> Iterator[str]:
+    return (s[i : i + chunk_size] for i in range(0, len(s), chunk_size))
 
 class BaseComputerTool:
     """
@@ -132,46 +162,49 @@ class BaseComputerTool:
     def __init__(self, page: Page | None = None):
         super().__init__()
         self.page = page
+        # JPEG is several times smaller than PNG for desktop screenshots; set
+        # KERNEL_SCREENSHOT_FORMAT=png for lossless captures
+        self._screenshot_format = os.environ.get("KERNEL_SCREENSHOT_FORMAT", "jpeg").lower()
+        self._screenshot_quality = int(os.environ.get("KERNEL_SCREENSHOT_QUALITY", "70"))
+        # Insert text in one shot instead of simulating each keystroke; faster,
+        # but skips per-key events that some pages listen for
+        self.fast_type = os.environ.get("KERNEL_FAST_TYPE", "").lower() in ("1", "true", "yes")
+        # (page, width, height) of the measured viewport, see _viewport_size
+        self._viewport: tuple[Page, int, int] | None = None
+
+    @cached_property
+    def _params(self) -> BetaToolUnionParam:
+        # Everything here is fixed once the tool exists, so build it only once
+        return cast(
+            "BetaToolUnionParam",
+            {"name": self.name, "type": self.api_type, **self.options},
+        )
 
     def validate_coordinates(self, coordinate: tuple[int, int] | list[int] | None = None) -> tuple[int, int] | None:
-        """Validate that coordinates are non-negative integers and convert lists to tuples if needed."""
+        """Validate that coordinates are two non-negative integers and return them as a tuple."""
+        # Already a valid tuple: hand it back without unpacking or allocating
+        if type(coordinate) is tuple and len(coordinate) == 2:
+            x, y = coordinate
+            if type(x) is int and type(y) is int and x >= 0 and y >= 0:
+                return coordinate
+
         if coordinate is None:
             return None
-            
-        # Convert list to tuple if needed
-        if isinstance(coordinate, list):
-            coordinate = tuple(coordinate)
-            
-        if not isinstance(coordinate, tuple) or len(coordinate) != 2:
-            raise ToolError(f"{coordinate} must be a tuple or list of length 2")
-            
-        x, y = coordinate
-        if not isinstance(x, int) or not isinstance(y, int) or x < 0 or y < 0:
+
+        # Unpacking accepts lists and tuples alike without building an intermediate tuple
+        try:
+            x, y = coordinate
+        except (TypeError, ValueError):
+            raise ToolError(f"{coordinate} must be a tuple or list of length 2") from None
+
+        if type(x) is not int or type(y) is not int or x < 0 or y < 0:
             raise ToolError(f"{coordinate} must be a tuple or list of non-negative ints")
-            
-        return coordinate
+
+        return (x, y)
 
     def map_key(self, key: str) -> str:
         """Map a key to its Playwright equivalent."""
-        # Handle modifier keys
-        if key.lower() in MODIFIER_KEY_MAP:
-            return MODIFIER_KEY_MAP[key.lower()]
-        
-        # Handle special keys
-        if key.lower() in KEY_MAP:
-            return KEY_MAP[key.lower()]
-        
-        # Handle key combinations (e.g. "ctrl+a")
-        if '+' in key:
-            parts = key.split('+')
-            if len(parts) == 2:
-                modifier, main_key = parts
-                mapped_modifier = MODIFIER_KEY_MAP.get(modifier.lower(), modifier)
-                mapped_key = KEY_MAP.get(main_key.lower(), main_key)
-                return f"{mapped_modifier}+{mapped_key}"
-        
-        # Return the key as is if no mapping exists
-        return key
+        return _map_key(key)
 
     async def __call__(
         self,
@@ -184,103 +217,129 @@ class BaseComputerTool:
         if not self.page:
             raise ToolError("Playwright page not initialized")
 
-        if action in ("mouse_move", "left_click_drag"):
-            if coordinate is None:
-                raise ToolError(f"coordinate is required for {action}")
-            if text is not None:
-                raise ToolError(f"text is not accepted for {action}")
+        handler = self._handlers.get(action)
+        if handler is None:
+            raise ToolError(f"Invalid action: {action}")
+        return await handler(action, text=text, coordinate=coordinate, **kwargs)
 
-            coordinate = self.validate_coordinates(coordinate)
-            x, y = coordinate
+    @cached_property
+    def _handlers(self) -> dict[str, Callable[..., Awaitable[ToolResult]]]:
+        """Map each supported action to the coroutine method that performs it."""
+        return {
+            "mouse_move": self._mouse_move,
+            "left_click_drag": self._left_click_drag,
+            "key": self._key,
+            "type": self._type,
+            "left_click": self._click,
+            "right_click": self._click,
+            "middle_click": self._click,
+            "double_click": self._click,
+            "screenshot": self._screenshot,
+            "cursor_position": self._cursor_position,
+        }
 
-            if action == "mouse_move":
-                await self.page.mouse.move(x, y)
-                return await self.screenshot()
-            elif action == "left_click_drag":
-                await self.page.mouse.down(button="left")
-                await self.page.mouse.move(x, y)
-                await self.page.mouse.up(button="left")
-                return await self.screenshot()
-
-        if action in ("key", "type"):
-            if text is None:
-                raise ToolError(f"text is required for {action}")
-            if coordinate is not None:
-                raise ToolError(f"coordinate is not accepted for {action}")
-            if not isinstance(text, str):
-                raise ToolError(output=f"{text} must be a string")
-
-            if action == "key":
-                mapped_key = self.map_key(text)
-                await self.page.keyboard.press(mapped_key)
-                return await self.screenshot()
-            elif action == "type":
-                results: list[ToolResult] = []
-                for chunk in chunks(text, TYPING_GROUP_SIZE):
-                    await self.page.keyboard.type(chunk, delay=TYPING_DELAY_MS)
-                    results.append(await self.screenshot())
-                return ToolResult(
-                    output="".join(result.output or "" for result in results),
-                    error="".join(result.error or "" for result in results),
-                    base64_image=results[-1].base64_image if results else None,
-                )
-
-        if action in (
-            "left_click",
-            "right_click",
-            "double_click",
-            "middle_click",
-            "screenshot",
-            "cursor_position",
-        ):
-            if text is not None:
-                raise ToolError(f"text is not accepted for {action}")
-
-            if action == "screenshot":
-                return await self.screenshot()
-            elif action == "cursor_position":
-                # Playwright doesn't provide a direct way to get cursor position
-                # We'll return a placeholder since this isn't critical functionality
-                return ToolResult(output="Cursor position not available in Playwright")
-            else:
-                if coordinate is not None:
-                    coordinate = self.validate_coordinates(coordinate)
-                    x, y = coordinate
-                    await self.page.mouse.move(x, y)
-                
-                if action == "double_click":
-                    await self.page.mouse.dblclick(x, y)
-                else:
-                    await self.page.mouse.click(x, y, button=MOUSE_BUTTONS[action])
-                return await self.screenshot()
-
-        raise ToolError(f"Invalid action: {action}")
+    def _require_coordinate(self, action: str, text: str | None, coordinate) -> tuple[int, int]:
+        if coordinate is None:
+            raise ToolError(f"coordinate is required for {action}")
+        if text is not None:
+            raise ToolError(f"text is not accepted for {action}")
+        return self.validate_coordinates(coordinate)
+
+    def _require_text(self, action: str, text: str | None, coordinate) -> str:
+        if text is None:
+            raise ToolError(f"text is required for {action}")
+        if coordinate is not None:
+            raise ToolError(f"coordinate is not accepted for {action}")
+        if not isinstance(text, str):
+            raise ToolError(f"{text} must be a string")
+        return text
+
+    async def _mouse_move(self, action, *, text=None, coordinate=None, **kwargs):
+        x, y = self._require_coordinate(action, text, coordinate)
+        await self.page.mouse.move(x, y)
+        return await self.screenshot()
+
+    async def _left_click_drag(self, action, *, text=None, coordinate=None, **kwargs):
+        x, y = self._require_coordinate(action, text, coordinate)
+        await self.page.mouse.down(button="left")
+        await self.page.mouse.move(x, y)
+        await self.page.mouse.up(button="left")
+        return await self.screenshot()
+
+    async def _key(self, action, *, text=None, coordinate=None, **kwargs):
+        text = self._require_text(action, text, coordinate)
+        await self.page.keyboard.press(self.map_key(text))
+        return await self.screenshot()
+
+    async def _type(self, action, *, text=None, coordinate=None, **kwargs):
+        text = self._require_text(action, text, coordinate)
+        if self.fast_type:
+            await self.page.keyboard.insert_text(text)
+            return await self.screenshot()
+        for chunk in chunks(text, TYPING_GROUP_SIZE):
+            await self.page.keyboard.type(chunk, delay=TYPING_DELAY_MS)
+        # Only the final state matters to the model, so take one screenshot
+        return await self.screenshot()
+
+    async def _screenshot(self, action, *, text=None, coordinate=None, **kwargs):
+        if text is not None:
+            raise ToolError(f"text is not accepted for {action}")
+        return await self.screenshot()
+
+    async def _cursor_position(self, action, *, text=None, coordinate=None, **kwargs):
+        if text is not None:
+            raise ToolError(f"text is not accepted for {action}")
+        # Playwright doesn't provide a direct way to get cursor position
+        # We'll return a placeholder since this isn't critical functionality
+        return ToolResult(output="Cursor position not available in Playwright")
+
+    async def _click(self, action, *, text=None, coordinate=None, **kwargs):
+        # mouse.click/dblclick move to (x, y) themselves
+        x, y = self._require_coordinate(action, text, coordinate)
+
+        if action == "double_click":
+            await self.page.mouse.dblclick(x, y)
+        else:
+            await self.page.mouse.click(x, y, button=MOUSE_BUTTONS.get(action, "left"))
+        return await self.screenshot()
 
     async def screenshot(self):
-        """Take a screenshot using Playwright and return the base64 encoded image."""
+        """Take a screenshot using Playwright and return the raw image bytes."""
         if not self.page:
             raise ToolError("Playwright page not initialized")
 
         # Take screenshot using Playwright and get the buffer directly
-        screenshot_bytes = await self.page.screenshot(type="png")
-        return ToolResult(
-            base64_image=base64.b64encode(screenshot_bytes).decode()
-        )
+        if self._screenshot_format == "jpeg":
+            screenshot_bytes = await self.page.screenshot(
+                type="jpeg", quality=self._screenshot_quality
+            )
+        else:
+            screenshot_bytes = await self.page.screenshot(type="png")
+        return ToolResult(image=screenshot_bytes)
 
 class ComputerTool20241022(BaseComputerTool, BaseAnthropicTool):
     api_type: Literal["computer_20241022"] = "computer_20241022"
 
     def to_params(self) -> BetaToolComputerUse20241022Param:
-        return {"name": self.name, "type": self.api_type, **self.options}
+        return cast("BetaToolComputerUse20241022Param", self._params)
 
 class ComputerTool20250124(BaseComputerTool, BaseAnthropicTool):
     api_type: Literal["computer_20250124"] = "computer_20250124"
 
     def to_params(self):
-        return cast(
-            BetaToolUnionParam,
-            {"name": self.name, "type": self.api_type, **self.options},
-        )
+        return self._params
+
+    @cached_property
+    def _handlers(self) -> dict[str, Callable[..., Awaitable[ToolResult]]]:
+        return {
+            **super()._handlers,
+            "left_mouse_down": self._left_mouse_down_up,
+            "left_mouse_up": self._left_mouse_down_up,
+            "scroll": self._scroll,
+            "hold_key": self._hold_key,
+            "wait": self._wait,
+            "triple_click": self._click,
+        }
 
     async def __call__(
         self,
@@ -294,111 +353,120 @@ class ComputerTool20250124(BaseComputerTool, BaseAnthropicTool):
         key: str | None = None,
         **kwargs,
     ):
-        if not self.page:
-            raise ToolError("Playwright page not initialized")
+        return await super().__call__(
+            action=action,
+            text=text,
+            coordinate=coordinate,
+            scroll_direction=scroll_direction,
+            scroll_amount=scroll_amount,
+            duration=duration,
+            key=key,
+            **kwargs,
+        )
 
-        if action in ("left_mouse_down", "left_mouse_up"):
-            if coordinate is not None:
-                raise ToolError(f"coordinate is not accepted for {action=}.")
-            if action == "left_mouse_down":
-                await self.page.mouse.down(button="left")
-            else:
-                await self.page.mouse.up(button="left")
-            return await self.screenshot()
+    async def _left_mouse_down_up(self, action, *, coordinate=None, **kwargs):
+        if coordinate is not None:
+            raise ToolError(f"coordinate is not accepted for {action=}.")
+        if action == "left_mouse_down":
+            await self.page.mouse.down(button="left")
+        else:
+            await self.page.mouse.up(button="left")
+        return await self.screenshot()
 
-        if action == "scroll":
-            if scroll_direction is None or scroll_direction not in get_args(
-                ScrollDirection
-            ):
-                raise ToolError(
-                    f"{scroll_direction=} must be 'up', 'down', 'left', or 'right'"
-                )
-            if not isinstance(scroll_amount, int) or scroll_amount < 0:
-                raise ToolError(f"{scroll_amount=} must be a non-negative int")
-
-            if coordinate is not None:
-                coordinate = self.validate_coordinates(coordinate)
-                x, y = coordinate
-                await self.page.mouse.move(x, y)
-
-            # Map scroll directions to Playwright's wheel events
-            page_dimensions = await self.page.evaluate(
-                "() => Promise.resolve({ h: window.innerHeight, w: window.innerWidth })"
+    async def _scroll(
+        self,
+        action,
+        *,
+        coordinate=None,
+        scroll_direction: ScrollDirection | None = None,
+        scroll_amount: int | None = None,
+        **kwargs,
+    ):
+        if scroll_direction not in _SCROLL_DIRECTIONS:
+            raise ToolError(
+                f"{scroll_direction=} must be 'up', 'down', 'left', or 'right'"
             )
-            page_partitions = 25
-            scroll_factor = scroll_amount / page_partitions
-            page_width = page_dimensions['w']
-            page_height = page_dimensions['h']
-
-            delta_x = 0
-            delta_y = 0
-            if scroll_direction == "up":
-                delta_y = -scroll_factor * page_height
-            elif scroll_direction == "down":
-                delta_y = scroll_factor * page_height
-            elif scroll_direction == "left":
-                delta_x = -scroll_factor * page_width
-            elif scroll_direction == "right":
-                delta_x = scroll_factor * page_width
-
-            print(f"Scrolling {abs(delta_x) if delta_x != 0 else abs(delta_y):.02f} pixels {scroll_direction}")
-
-            await self.page.mouse.wheel(delta_x=delta_x, delta_y=delta_y)
-            return await self.screenshot()
-
-        if action in ("hold_key", "wait"):
-            if duration is None or not isinstance(duration, (int, float)):
-                raise ToolError(f"{duration=} must be a number")
-            if duration < 0:
-                raise ToolError(f"{duration=} must be non-negative")
-            if duration > 100:
-                raise ToolError(f"{duration=} is too long.")
-
-            if action == "hold_key":
-                if text is None:
-                    raise ToolError(f"text is required for {action}")
-                mapped_key = self.map_key(text)
-                await self.page.keyboard.down(mapped_key)
-                await asyncio.sleep(duration)
-                await self.page.keyboard.up(mapped_key)
-                return await self.screenshot()
-
-            if action == "wait":
-                await asyncio.sleep(duration)
-                return await self.screenshot()
-
-        if action in (
-            "left_click",
-            "right_click",
-            "double_click",
-            "triple_click",
-            "middle_click",
-        ):
-            if text is not None:
-                raise ToolError(f"text is not accepted for {action}")
-
-            if coordinate is not None:
-                coordinate = self.validate_coordinates(coordinate)
-                x, y = coordinate
-                await self.page.mouse.move(x, y)
-
-            if key:
-                mapped_key = self.map_key(key)
-                await self.page.keyboard.down(mapped_key)
-
-            if action == "triple_click":
-                # Playwright doesn't have triple click, so we'll simulate it
-                await self.page.mouse.click(x, y, click_count=3)
-            elif action == "double_click":
-                await self.page.mouse.dblclick(x, y)
-            else:
-                await self.page.mouse.click(x, y, button=MOUSE_BUTTONS[action])
-
-            if key:
-                await self.page.keyboard.up(mapped_key)
-
-            return await self.screenshot()
+        if not isinstance(scroll_amount, int) or scroll_amount < 0:
+            raise ToolError(f"{scroll_amount=} must be a non-negative int")
 
-        return await super().__call__(
-            action=action, text=text, coordinate=coordinate, key=key, **kwargs
-        )
+        if coordinate is not None:
+            coordinate = self.validate_coordinates(coordinate)
+            x, y = coordinate
+            await self.page.mouse.move(x, y)
+
+        # Map scroll directions to Playwright's wheel events
+        width, height = await self._viewport_size()
+        page_partitions = 25
+        scroll_factor = scroll_amount / page_partitions
+
+        delta_x = 0
+        delta_y = 0
+        if scroll_direction == "up":
+            delta_y = -scroll_factor * height
+        elif scroll_direction == "down":
+            delta_y = scroll_factor * height
+        elif scroll_direction == "left":
+            delta_x = -scroll_factor * width
+        elif scroll_direction == "right":
+            delta_x = scroll_factor * width
+
+        logger.debug("Scrolling %.2f pixels %s", abs(delta_x) or abs(delta_y), scroll_direction)
+
+        await self.page.mouse.wheel(delta_x=delta_x, delta_y=delta_y)
+        return await self.screenshot()
+
+    async def _viewport_size(self) -> tuple[int, int]:
+        """Measure the page's viewport once per page rather than on every scroll."""
+        assert self.page is not None
+        if self._viewport is None or self._viewport[0] is not self.page:
+            dimensions = await self.page.evaluate(
+                "() => ({ h: window.innerHeight, w: window.innerWidth })"
+            )
+            self._viewport = (self.page, dimensions["w"], dimensions["h"])
+        return self._viewport[1], self._viewport[2]
+
+    def _validate_duration(self, duration: int | float | None) -> None:
+        if duration is None or not isinstance(duration, (int, float)):
+            raise ToolError(f"{duration=} must be a number")
+        if duration < 0:
+            raise ToolError(f"{duration=} must be non-negative")
+        if duration > 100:
+            raise ToolError(f"{duration=} is too long.")
+
+    async def _hold_key(self, action, *, text=None, duration=None, **kwargs):
+        self._validate_duration(duration)
+        if text is None:
+            raise ToolError(f"text is required for {action}")
+        mapped_key = self.map_key(text)
+        await self.page.keyboard.down(mapped_key)
+        await asyncio.sleep(duration)
+        await self.page.keyboard.up(mapped_key)
+        return await self.screenshot()
+
+    async def _wait(self, action, *, duration=None, **kwargs):
+        self._validate_duration(duration)
+        await asyncio.sleep(duration)
+        return await self.screenshot()
+
+    async def _click(self, action, *, text=None, coordinate=None, key=None, **kwargs):
+        x, y = self._require_coordinate(action, text, coordinate)
+
+        if key:
+            # Position the pointer before holding the modifier; otherwise the
+            # click itself does the move
+            await self.page.mouse.move(x, y)
+            mapped_key = self.map_key(key)
+            await self.page.keyboard.down(mapped_key)
+
+        if action == "triple_click":
+            # Playwright doesn't have triple click, so we'll simulate it
+            await self.page.mouse.click(x, y, click_count=3)
+        elif action == "double_click":
+            await self.page.mouse.dblclick(x, y)
+        else:
+            await self.page.mouse.click(x, y, button=MOUSE_BUTTONS.get(action, "left"))
+
+        if key:
+            await self.page.keyboard.up(mapped_key)
+
+        return await self.screenshot()
@@ -1,5 +1,6 @@
 import time
 import base64
+from functools import lru_cache
 from typing import List, Dict, Literal
 from playwright.sync_api import sync_playwright, Browser, Page
 from utils import check_blocklisted_url
@@ -34,6 +35,12 @@ CUA_KEY_TO_PLAYWRIGHT_KEY = {
 }
 
 
+@lru_cache(maxsize=256)
+def _map_key(key: str) -> str:
+    """Translate a CUA key name to its Playwright equivalent, memoized per name."""
+    return CUA_KEY_TO_PLAYWRIGHT_KEY.get(key.lower(), key)
+
+
 class BasePlaywrightComputer:
     """
     Abstract base for Playwright-based computers:
@@ -120,7 +127,7 @@ class BasePlaywrightComputer:
         self._page.mouse.move(x, y)
 
     def keypress(self, keys: List[str]) -> None:
-        mapped_keys = [CUA_KEY_TO_PLAYWRIGHT_KEY.get(key.lower(), key) for key in keys]
+        mapped_keys = [_map_key(key) for key in keys]
         for key in mapped_keys:
             self._page.keyboard.down(key)
         for key in reversed(mapped_keys):
@@ -54,10 +54,11 @@ async def cua_task(
         with KernelPlaywrightBrowser({"cdp_ws_url": cdp_ws_url}) as computer:
 
             # messages to provide to the agent
+            now = datetime.datetime.now(datetime.UTC)
             items = [
                 {
                     "role": "system",
-                    "content": f"- Current date and time: {datetime.datetime.utcnow().isoformat()} ({datetime.datetime.utcnow().strftime('%A')})",
+                    "content": f"- Current date and time: {now.isoformat()} ({now.strftime('%A')})",
                 },
                 {
                     "role": "user",
@@ -1,6 +1,7 @@
+import asyncio
 import kernel
 from kernel import Kernel
-from playwright.async_api import async_playwright
+from playwright.async_api import Route, async_playwright
 from typing import TypedDict
 from urllib.parse import urlparse
 
@@ -9,6 +10,20 @@ client = Kernel()
 # Create a new Kernel app
 app = kernel.App("python-basic")
 
+# Fail fast on unresponsive sites rather than holding the browser for
+# Playwright's 30s default
+_NAVIGATION_TIMEOUT_MS = 15_000
+
+# Subresources the page title never depends on
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media", "stylesheet"})
+
+
+async def _block_heavy_resources(route: Route) -> None:
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
 """
 Example app that extracts the title of a webpage
 Args:
@@ -38,31 +53,41 @@ async def get_page_title(ctx: kernel.KernelContext, input_data: PageTitleInput)
     if not url.startswith(('http://', 'https://')):
         url = f"https://{url}"
 
-    # Validate the URL
+    # Validate the URL: urlparse raises on malformed hosts such as broken IPv6
+    # literals, and leaves hostname empty for inputs like "https://" or
+    # "https://:::". It silently drops some whitespace, so reject that first.
     try:
-        urlparse(url)
-    except Exception:
+        hostname = None if any(c.isspace() for c in url) else urlparse(url).hostname
+    except ValueError:
+        hostname = None
+    if not hostname:
         raise ValueError(f"Invalid URL: {url}")
 
     # Create a browser instance using the context's invocation_id
-    kernel_browser = client.browsers.create(invocation_id=ctx.invocation_id)
+    kernel_browser = await asyncio.to_thread(
+        client.browsers.create, invocation_id=ctx.invocation_id
+    )
     print("Kernel browser live view url: ", kernel_browser.browser_live_view_url)
     
     async with async_playwright() as playwright:
         browser = await playwright.chromium.connect_over_cdp(kernel_browser.cdp_ws_url)
         context = await browser.new_context()
+        context.set_default_navigation_timeout(_NAVIGATION_TIMEOUT_MS)
+        await context.route("**/*", _block_heavy_resources)
         page = await context.new_page()
         
         try:
             ####################################
             # Your browser automation logic here
             ####################################
-            await page.goto(url)
+            # The title is in the parsed HTML, so don't wait for images,
+            # stylesheets and other subresources to finish loading
+            await page.goto(url, wait_until="domcontentloaded")
             title = await page.title()
             
             return {"title": title}
         finally:
-            client.browsers.delete_by_id(kernel_browser.session_id)
+            await asyncio.to_thread(client.browsers.delete_by_id, kernel_browser.session_id)
 
 
 """
@@ -84,7 +109,8 @@ class CreateBrowserForTestingOutput(TypedDict):
 
 @app.action("create-browser-for-testing")
 async def create_browser_for_testing(ctx: kernel.KernelContext) -> CreateBrowserForTestingOutput:
-    kernel_browser = client.browsers.create(
+    kernel_browser = await asyncio.to_thread(
+        client.browsers.create,
         invocation_id=ctx.invocation_id,
         stealth=True,
         timeout_seconds=3600,  # Keep browser alive for 1 hour
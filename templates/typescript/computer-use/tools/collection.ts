@@ -4,6 +4,9 @@ import type { ActionParams, ToolResult } from './types/computer';
 
 export type ToolVersion = 'computer_use_20250124' | 'computer_use_20241022' | 'computer_use_20250429';
 
+// Enum values are fixed, so build the lookup once instead of scanning Object.values per call
+const ACTION_VALUES: ReadonlySet<string> = new Set(Object.values(Action));
+
 export const DEFAULT_TOOL_VERSION: ToolVersion = 'computer_use_20250429';
 
 interface ToolGroup {
@@ -46,16 +49,18 @@ export class ToolCollection {
     return Array.from(this.tools.values()).map(tool => tool.toParams());
   }
 
-  async run(name: string, toolInput: { action: Action } & Record<string, ActionParams>): Promise<ToolResult> {
+  // Not async: validation errors throw synchronously and the tool's own promise
+  // is handed straight back, so callers awaiting run() see the same behaviour
+  run(name: string, toolInput: { action: Action } & Record<string, ActionParams>): Promise<ToolResult> {
     const tool = this.tools.get(name);
     if (!tool) {
       throw new Error(`Tool ${name} not found`);
     }
 
-    if (!Object.values(Action).includes(toolInput.action)) {
+    if (!ACTION_VALUES.has(toolInput.action)) {
       throw new Error(`Invalid action ${toolInput.action} for tool ${name}`);
     }
 
-    return await tool.call(toolInput);
+    return tool.call(toolInput);
   }
 } 
\ No newline at end of file
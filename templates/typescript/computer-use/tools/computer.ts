@@ -1,84 +1,148 @@
-import type { Page } from 'playwright';
+import { errors } from 'playwright';
+import type { CDPSession, Page } from 'playwright';
 import { Action, ToolError } from './types/computer';
-import type { ActionParams, BaseAnthropicTool, ToolResult } from './types/computer';
+import type { ActionKind, ActionParams, BaseAnthropicTool, Coordinate, MouseButton, ToolResult } from './types/computer';
 import { KeyboardUtils } from './utils/keyboard';
 import { ActionValidator } from './utils/validator';
 
 const TYPING_DELAY_MS = 12;
+const SETTLE_FLOOR_MS = 300;
+const SETTLE_TIMEOUT_MS = 1500;
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+// JPEG is several times smaller than PNG for desktop screenshots; set
+// KERNEL_SCREENSHOT_FORMAT=png for lossless captures
+const SCREENSHOT_FORMAT: 'png' | 'jpeg' =
+  process.env.KERNEL_SCREENSHOT_FORMAT?.toLowerCase() === 'png' ? 'png' : 'jpeg';
+const SCREENSHOT_QUALITY = Number(process.env.KERNEL_SCREENSHOT_QUALITY ?? 70);
+
+// Insert text in one shot instead of simulating each keystroke; faster, but
+// skips per-key events that some pages listen for
+const FAST_TYPE = ['1', 'true', 'yes'].includes(process.env.KERNEL_FAST_TYPE?.toLowerCase() ?? '');
+
+const BUTTON_FOR_ACTION: ReadonlyMap<Action, MouseButton> = new Map<Action, MouseButton>([
+  [Action.LEFT_CLICK, 'left'],
+  [Action.DOUBLE_CLICK, 'left'],
+  [Action.TRIPLE_CLICK, 'left'],
+  [Action.LEFT_CLICK_DRAG, 'left'],
+  [Action.LEFT_MOUSE_DOWN, 'left'],
+  [Action.LEFT_MOUSE_UP, 'left'],
+  [Action.RIGHT_CLICK, 'right'],
+  [Action.MIDDLE_CLICK, 'middle'],
+]);
+
+// Which family each action belongs to. Fixed per action, so it is worked out
+// once here rather than probed per call
+const ACTION_KIND: ReadonlyMap<Action, ActionKind> = new Map<Action, ActionKind>([
+  [Action.LEFT_CLICK, 'mouse'],
+  [Action.RIGHT_CLICK, 'mouse'],
+  [Action.MIDDLE_CLICK, 'mouse'],
+  [Action.DOUBLE_CLICK, 'mouse'],
+  [Action.TRIPLE_CLICK, 'mouse'],
+  [Action.MOUSE_MOVE, 'mouse'],
+  [Action.LEFT_CLICK_DRAG, 'mouse'],
+  [Action.LEFT_MOUSE_DOWN, 'mouse'],
+  [Action.LEFT_MOUSE_UP, 'mouse'],
+  [Action.KEY, 'keyboard'],
+  [Action.TYPE, 'keyboard'],
+  [Action.HOLD_KEY, 'keyboard'],
+  [Action.SCREENSHOT, 'system'],
+  [Action.CURSOR_POSITION, 'system'],
+  [Action.SCROLL, 'system'],
+  [Action.WAIT, 'system'],
+]);
+
+type ActionHandler = (params: ActionParams, coordinate: Coordinate | undefined) => Promise<ToolResult>;
 
 export class ComputerTool implements BaseAnthropicTool {
   name: 'computer' = 'computer';
   protected page: Page;
-  protected _screenshotDelay = 2.0;
   protected version: '20241022' | '20250124';
 
-  private readonly mouseActions = new Set([
-    Action.LEFT_CLICK,
-    Action.RIGHT_CLICK,
-    Action.MIDDLE_CLICK,
-    Action.DOUBLE_CLICK,
-    Action.TRIPLE_CLICK,
-    Action.MOUSE_MOVE,
-    Action.LEFT_CLICK_DRAG,
-    Action.LEFT_MOUSE_DOWN,
-    Action.LEFT_MOUSE_UP,
-  ]);
-
-  private readonly keyboardActions = new Set([
-    Action.KEY,
-    Action.TYPE,
-    Action.HOLD_KEY,
-  ]);
-
-  private readonly systemActions = new Set([
-    Action.SCREENSHOT,
-    Action.CURSOR_POSITION,
-    Action.SCROLL,
-    Action.WAIT,
-  ]);
+  readonly apiType: 'computer_20241022' | 'computer_20250124';
+
+  // Action -> handler, so call() dispatches with a single lookup
+  private readonly handlers: ReadonlyMap<Action, ActionHandler>;
 
   constructor(page: Page, version: '20241022' | '20250124' = '20250124') {
     this.page = page;
     this.version = version;
-  }
+    this.apiType = version === '20241022' ? 'computer_20241022' : 'computer_20250124';
 
-  get apiType(): 'computer_20241022' | 'computer_20250124' {
-    return this.version === '20241022' ? 'computer_20241022' : 'computer_20250124';
+    const handlers = new Map<Action, ActionHandler>([
+      [Action.SCREENSHOT, () => this.screenshot()],
+      [Action.CURSOR_POSITION, () => this.handleCursorPosition()],
+      [Action.SCROLL, (params, coordinate) => this.handleScroll(params, coordinate)],
+      [Action.WAIT, params => this.handleWait(params.action, params.duration)],
+    ]);
+    for (const [action, kind] of ACTION_KIND) {
+      if (kind === 'mouse') {
+        handlers.set(action, (_params, coordinate) => this.handleMouseAction(action, coordinate));
+      } else if (kind === 'keyboard') {
+        handlers.set(action, params => this.handleKeyboardAction(action, params.text, params.duration));
+      }
+    }
+    this.handlers = handlers;
   }
 
+  // Params never change after construction, so build them once on first use
+  private params?: ActionParams;
+
   toParams(): ActionParams {
-    const params = {
-      name: this.name,
-      type: this.apiType,
-      display_width_px: 1280,
-      display_height_px: 720,
-      display_number: null,
-    };
-    return params;
+    if (!this.params) {
+      this.params = {
+        name: this.name,
+        type: this.apiType,
+        display_width_px: 1280,
+        display_height_px: 720,
+        display_number: null,
+      } as unknown as ActionParams;
+    }
+    return this.params;
+  }
+
+  // Lazily opened CDP session used for screenshots and fast typing; resolves to
+  // null when the browser doesn't support CDP so we fall back to Playwright
+  private cdpSession?: Promise<CDPSession | null>;
+
+  private getCDPSession(): Promise<CDPSession | null> {
+    if (!this.cdpSession) {
+      this.cdpSession = this.page.context().newCDPSession(this.page).catch(() => null);
+    }
+    return this.cdpSession;
   }
 
-  private getMouseButton(action: Action): 'left' | 'right' | 'middle' {
-    switch (action) {
-      case Action.LEFT_CLICK:
-      case Action.DOUBLE_CLICK:
-      case Action.TRIPLE_CLICK:
-      case Action.LEFT_CLICK_DRAG:
-      case Action.LEFT_MOUSE_DOWN:
-      case Action.LEFT_MOUSE_UP:
-        return 'left';
-      case Action.RIGHT_CLICK:
-        return 'right';
-      case Action.MIDDLE_CLICK:
-        return 'middle';
-      default:
-        throw new ToolError(`Invalid mouse action: ${action}`);
+  private getMouseButton(action: Action): MouseButton {
+    const button = BUTTON_FOR_ACTION.get(action);
+    if (!button) {
+      throw new ToolError(`Invalid mouse action: ${action}`);
+    }
+    return button;
+  }
+
+  // Wait for any loading the action triggered to finish. waitForLoadState
+  // resolves at once if the current document is already idle, so give the
+  // page a short head start to begin any navigation or requests first.
+  private async waitForSettle(): Promise<void> {
+    await sleep(SETTLE_FLOOR_MS);
+    try {
+      await this.page.waitForLoadState('networkidle', { timeout: SETTLE_TIMEOUT_MS });
+    } catch (error) {
+      if (!(error instanceof errors.TimeoutError)) {
+        throw error;
+      }
     }
   }
 
-  private async handleMouseAction(action: Action, coordinate: [number, number]): Promise<ToolResult> {
-    const [x, y] = ActionValidator.validateAndGetCoordinates(coordinate);
+  private async handleMouseAction(action: Action, coordinate: Coordinate | undefined): Promise<ToolResult> {
+    if (!coordinate) {
+      throw new ToolError(`coordinate is required for ${action}`);
+    }
+    const [x, y] = coordinate;
     await this.page.mouse.move(x, y);
-    await this.page.waitForTimeout(100);
+    // Local timer; page.waitForTimeout would cost a round-trip to the browser
+    await sleep(100);
 
     if (action === Action.LEFT_MOUSE_DOWN) {
       await this.page.mouse.down();
@@ -95,144 +159,161 @@ export class ComputerTool implements BaseAnthropicTool {
       }
     }
 
-    await this.page.waitForTimeout(500);
+    await this.waitForSettle();
     return await this.screenshot();
   }
 
-  private async handleKeyboardAction(action: Action, text: string, duration?: number): Promise<ToolResult> {
+  private async handleKeyboardAction(action: Action, text: string | undefined, duration?: number): Promise<ToolResult> {
+    if (!text) {
+      throw new ToolError(`text is required for ${action}`);
+    }
     if (action === Action.HOLD_KEY) {
       const key = KeyboardUtils.getPlaywrightKey(text);
       await this.page.keyboard.down(key);
-      await new Promise(resolve => setTimeout(resolve, duration! * 1000));
+      await sleep(duration! * 1000);
       await this.page.keyboard.up(key);
     } else if (action === Action.KEY) {
       const keys = KeyboardUtils.parseKeyCombination(text);
       for (const key of keys) {
         await this.page.keyboard.down(key);
       }
-      for (const key of keys.reverse()) {
-        await this.page.keyboard.up(key);
+      for (let i = keys.length - 1; i >= 0; i--) {
+        await this.page.keyboard.up(keys[i]!);
+      }
+    } else if (FAST_TYPE) {
+      const cdp = await this.getCDPSession();
+      if (cdp) {
+        await cdp.send('Input.insertText', { text });
+      } else {
+        await this.page.keyboard.insertText(text);
       }
     } else {
       await this.page.keyboard.type(text, { delay: TYPING_DELAY_MS });
     }
 
-    await this.page.waitForTimeout(500);
+    await this.waitForSettle();
     return await this.screenshot();
   }
 
   async screenshot(): Promise<ToolResult> {
     try {
       console.log('Starting screenshot...');
-      await new Promise(resolve => setTimeout(resolve, this._screenshotDelay * 1000));
-      const screenshot = await this.page.screenshot({ type: 'png' });
-      console.log('Screenshot taken, size:', screenshot.length, 'bytes');
+      // CDP hands back base64 directly and skips Playwright's screenshot
+      // bookkeeping, which adds noticeable latency per call
+      const cdp = await this.getCDPSession();
+      let base64Image: string;
+      if (cdp) {
+        const { data } = await cdp.send('Page.captureScreenshot', {
+          format: SCREENSHOT_FORMAT,
+          quality: SCREENSHOT_FORMAT === 'jpeg' ? SCREENSHOT_QUALITY : undefined,
+          captureBeyondViewport: false,
+        });
+        base64Image = data;
+      } else {
+        const screenshot = await this.page.screenshot(
+          SCREENSHOT_FORMAT === 'jpeg' ? { type: 'jpeg', quality: SCREENSHOT_QUALITY } : { type: 'png' }
+        );
+        base64Image = screenshot.toString('base64');
+      }
+      console.log('Screenshot taken, size:', base64Image.length, 'base64 chars');
 
       return {
-        base64Image: screenshot.toString('base64'),
+        base64Image,
+        imageMediaType: SCREENSHOT_FORMAT === 'jpeg' ? 'image/jpeg' : 'image/png',
       };
     } catch (error) {
       throw new ToolError(`Failed to take screenshot: ${error}`);
     }
   }
 
-  async call(params: ActionParams): Promise<ToolResult> {
+  private async handleCursorPosition(): Promise<ToolResult> {
+    const position = await this.page.evaluate(() => {
+      const selection = window.getSelection();
+      const range = selection?.getRangeAt(0);
+      const rect = range?.getBoundingClientRect();
+      return rect ? { x: rect.x, y: rect.y } : null;
+    });
+    
+    if (!position) {
+      throw new ToolError('Failed to get cursor position');
+    }
+    
+    return { output: `X=${position.x},Y=${position.y}` };
+  }
+
+  private async handleScroll(params: ActionParams, coordinate: Coordinate | undefined): Promise<ToolResult> {
     const { 
       action, 
-      text, 
-      coordinate, 
       scrollDirection: scrollDirectionParam,
       scroll_amount,
       scrollAmount,
-      duration, 
       ...kwargs 
     } = params;
 
-    ActionValidator.validateActionParams(params, this.mouseActions, this.keyboardActions);
-
-    if (action === Action.SCREENSHOT) {
-      return await this.screenshot();
-    }
-
-    if (action === Action.CURSOR_POSITION) {
-      const position = await this.page.evaluate(() => {
-        const selection = window.getSelection();
-        const range = selection?.getRangeAt(0);
-        const rect = range?.getBoundingClientRect();
-        return rect ? { x: rect.x, y: rect.y } : null;
-      });
-      
-      if (!position) {
-        throw new ToolError('Failed to get cursor position');
-      }
-      
-      return { output: `X=${position.x},Y=${position.y}` };
+    if (this.version !== '20250124') {
+      throw new ToolError(`${action} is only available in version 20250124`);
     }
 
-    if (action === Action.SCROLL) {
-      if (this.version !== '20250124') {
-        throw new ToolError(`${action} is only available in version 20250124`);
-      }
-
-      const scrollDirection = scrollDirectionParam || kwargs.scroll_direction;
-      const scrollAmountValue = scrollAmount || scroll_amount;
+    const scrollDirection = scrollDirectionParam || kwargs.scroll_direction;
+    const scrollAmountValue = scrollAmount || scroll_amount;
 
-      if (!scrollDirection || !['up', 'down', 'left', 'right'].includes(scrollDirection)) {
-        throw new ToolError(`Scroll direction "${scrollDirection}" must be 'up', 'down', 'left', or 'right'`);
-      }
-      if (typeof scrollAmountValue !== 'number' || scrollAmountValue < 0) {
-        throw new ToolError(`Scroll amount "${scrollAmountValue}" must be a non-negative number`);
-      }
-
-      if (coordinate) {
-        const [x, y] = ActionValidator.validateAndGetCoordinates(coordinate);
-        await this.page.mouse.move(x, y);
-        await this.page.waitForTimeout(100);
-      }
+    if (!scrollDirection || !['up', 'down', 'left', 'right'].includes(scrollDirection)) {
+      throw new ToolError(`Scroll direction "${scrollDirection}" must be 'up', 'down', 'left', or 'right'`);
+    }
+    if (typeof scrollAmountValue !== 'number' || scrollAmountValue < 0) {
+      throw new ToolError(`Scroll amount "${scrollAmountValue}" must be a non-negative number`);
+    }
 
-      const pageDimensions = await this.page.evaluate(() => {
-	      return { h: window.innerHeight, w: window.innerWidth };
-      });
-      const pagePartitions = 25;
-      const scrollFactor = (scrollAmountValue || 10) / pagePartitions;
-      
-      if (scrollDirection === 'down' || scrollDirection === 'up') {
-        const amount = pageDimensions.h * scrollFactor;
-        console.log(`Scrolling ${amount.toFixed(2)} pixels ${scrollDirection}`);
-        await this.page.mouse.wheel(0, scrollDirection === 'down' ? amount : -amount);
-      } else {
-        const amount = pageDimensions.w * scrollFactor;
-        console.log(`Scrolling ${amount.toFixed(2)} pixels ${scrollDirection}`);
-        await this.page.mouse.wheel(scrollDirection === 'right' ? amount : -amount, 0);
-      }
-      
-      await this.page.waitForTimeout(500);
-      return await this.screenshot();
+    if (coordinate) {
+      const [x, y] = coordinate;
+      await this.page.mouse.move(x, y);
+      await sleep(100);
     }
 
-    if (action === Action.WAIT) {
-      if (this.version !== '20250124') {
-        throw new ToolError(`${action} is only available in version 20250124`);
-      }
-      await new Promise(resolve => setTimeout(resolve, duration! * 1000));
-      return await this.screenshot();
+    const pageDimensions = await this.page.evaluate(() => {
+      return { h: window.innerHeight, w: window.innerWidth };
+    });
+    const pagePartitions = 25;
+    const scrollFactor = (scrollAmountValue || 10) / pagePartitions;
+    
+    if (scrollDirection === 'down' || scrollDirection === 'up') {
+      const amount = pageDimensions.h * scrollFactor;
+      console.log(`Scrolling ${amount.toFixed(2)} pixels ${scrollDirection}`);
+      await this.page.mouse.wheel(0, scrollDirection === 'down' ? amount : -amount);
+    } else {
+      const amount = pageDimensions.w * scrollFactor;
+      console.log(`Scrolling ${amount.toFixed(2)} pixels ${scrollDirection}`);
+      await this.page.mouse.wheel(scrollDirection === 'right' ? amount : -amount, 0);
     }
+    
+    await this.waitForSettle();
+    return await this.screenshot();
+  }
 
-    if (this.mouseActions.has(action)) {
-      if (!coordinate) {
-        throw new ToolError(`coordinate is required for ${action}`);
-      }
-      return await this.handleMouseAction(action, coordinate);
+  private async handleWait(action: Action, duration: number | undefined): Promise<ToolResult> {
+    if (this.version !== '20250124') {
+      throw new ToolError(`${action} is only available in version 20250124`);
     }
+    await sleep(duration! * 1000);
+    return await this.screenshot();
+  }
 
-    if (this.keyboardActions.has(action)) {
-      if (!text) {
-        throw new ToolError(`text is required for ${action}`);
-      }
-      return await this.handleKeyboardAction(action, text, duration);
+  async call(params: ActionParams): Promise<ToolResult> {
+    const { action, text, duration } = params;
+    const handler = this.handlers.get(action);
+    if (!handler) {
+      throw new ToolError(`Invalid action: ${action}`);
     }
 
-    throw new ToolError(`Invalid action: ${action}`);
+    // Single validation pass; the coordinate it returns is already checked
+    const coordinate = ActionValidator.validateActionParams(
+      action,
+      text,
+      params.coordinate,
+      duration,
+      ACTION_KIND.get(action)
+    );
+    return await handler(params, coordinate);
   }
 }
 
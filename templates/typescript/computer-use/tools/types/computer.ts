@@ -26,6 +26,7 @@ export enum Action {
 export type Action_20241022 = Action;
 export type Action_20250124 = Action;
 
+export type ActionKind = 'mouse' | 'keyboard' | 'system';
 export type MouseButton = 'left' | 'right' | 'middle';
 export type ScrollDirection = 'up' | 'down' | 'left' | 'right';
 export type Coordinate = [number, number];
@@ -47,6 +48,7 @@ export interface ToolResult {
   output?: string;
   error?: string;
   base64Image?: string;
+  imageMediaType?: 'image/png' | 'image/jpeg';
   system?: string;
 }
 
@@ -46,6 +46,16 @@ export class KeyboardUtils {
     'plus': '+',
  };
 
+  // Both maps fused into one lookup keyed by lowercase name, so resolving a key
+  // is a single probe. A Map also avoids matching Object.prototype members.
+  private static readonly keyLookup: ReadonlyMap<string, string> = new Map(
+    Object.entries({ ...KeyboardUtils.modifierKeyMap, ...KeyboardUtils.keyMap })
+  );
+
+  // Parsed combos, memoised since a session reuses the same few shortcuts
+  private static readonly comboCache = new Map<string, readonly string[]>();
+  private static readonly COMBO_CACHE_SIZE = 256;
+
   static isModifierKey(key: string | undefined): boolean {
     if (!key) return false;
     const normalizedKey = this.modifierKeyMap[key.toLowerCase()] || key;
@@ -57,32 +67,36 @@ export class KeyboardUtils {
       throw new Error('Key cannot be undefined');
     }
 
-    const normalizedKey = key.toLowerCase();
-
-    // Handle special cases
-    if (normalizedKey in this.keyMap) {
-      return this.keyMap[normalizedKey] as string;
-    }
-
-    // Normalize modifier keys
-    if (normalizedKey in this.modifierKeyMap) {
-      return this.modifierKeyMap[normalizedKey] as string;
-    }
-
-    // Return the key as is - Playwright handles standard key names
-    return key;
+    // Handle special cases and normalize modifier keys; otherwise return the
+    // key as is - Playwright handles standard key names
+    return this.keyLookup.get(key.toLowerCase()) ?? key;
   }
 
-  static parseKeyCombination(combo: string): string[] {
+  static parseKeyCombination(combo: string): readonly string[] {
     if (!combo) {
       throw new Error('Key combination cannot be empty');
     }
-    return combo.toLowerCase().split('+').map(key => {
+    const cached = this.comboCache.get(combo);
+    if (cached) {
+      return cached;
+    }
+
+    // The whole combo is lowercased once up front, so tokens can go straight
+    // to the lookup
+    const keys = combo.toLowerCase().split('+').map(key => {
       const trimmedKey = key.trim();
       if (!trimmedKey) {
         throw new Error('Invalid key combination: empty key');
       }
-      return this.getPlaywrightKey(trimmedKey);
+      return this.keyLookup.get(trimmedKey) ?? trimmedKey;
     });
+
+    if (this.comboCache.size >= this.COMBO_CACHE_SIZE) {
+      this.comboCache.clear();
+    }
+    // Frozen because the cached array is shared between callers
+    const parsed = Object.freeze(keys);
+    this.comboCache.set(combo, parsed);
+    return parsed;
   }
-} 
\ No newline at end of file
+}
\ No newline at end of file
@@ -1,5 +1,5 @@
 import { Action, ToolError } from '../types/computer';
-import type { ActionParams, Coordinate, Duration } from '../types/computer';
+import type { ActionKind, Coordinate, Duration } from '../types/computer';
 
 export class ActionValidator {
   static validateText(text: string | undefined, required: boolean, action: string): void {
@@ -11,13 +11,11 @@ export class ActionValidator {
     }
   }
 
-  static validateCoordinate(coordinate: Coordinate | undefined, required: boolean, action: string): void {
+  static validateCoordinate(coordinate: Coordinate | undefined, required: boolean, action: string): Coordinate | undefined {
     if (required && !coordinate) {
       throw new ToolError(`coordinate is required for ${action}`);
     }
-    if (coordinate) {
-      this.validateAndGetCoordinates(coordinate);
-    }
+    return coordinate ? this.validateAndGetCoordinates(coordinate) : undefined;
   }
 
   static validateDuration(duration: Duration | undefined): void {
@@ -42,26 +40,29 @@ export class ActionValidator {
     return coordinate;
   }
 
-  static validateActionParams(params: ActionParams, mouseActions: Set<Action>, keyboardActions: Set<Action>): void {
-    const { action, text, coordinate, duration } = params;
+  /**
+   * Validates every parameter for the action in one pass and returns the
+   * validated coordinate, if any, so callers don't need to check it again.
+   */
+  static validateActionParams(
+    action: Action,
+    text: string | undefined,
+    coordinate: Coordinate | undefined,
+    duration: Duration | undefined,
+    kind: ActionKind | undefined
+  ): Coordinate | undefined {
 
     // Validate text parameter
-    if (keyboardActions.has(action)) {
-      this.validateText(text, true, action);
-    } else {
-      this.validateText(text, false, action);
-    }
+    this.validateText(text, kind === 'keyboard', action);
 
     // Validate coordinate parameter
-    if (mouseActions.has(action)) {
-      this.validateCoordinate(coordinate, true, action);
-    } else {
-      this.validateCoordinate(coordinate, false, action);
-    }
+    const validCoordinate = this.validateCoordinate(coordinate, kind === 'mouse', action);
 
     // Validate duration parameter
     if (action === Action.HOLD_KEY || action === Action.WAIT) {
       this.validateDuration(duration);
     }
+
+    return validCoordinate;
   }
 } 
\ No newline at end of file
@@ -18,7 +18,7 @@ export interface BetaImageBlock {
   type: 'image';
   source: {
     type: 'base64';
-    media_type: 'image/png';
+    media_type: 'image/png' | 'image/jpeg';
     data: string;
   };
   id?: string;
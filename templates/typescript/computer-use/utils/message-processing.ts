@@ -20,34 +20,30 @@ export function maybeFilterToNMostRecentImages(
 ): void {
   if (!imagesToKeep) return;
 
-  const toolResultBlocks = messages
-    .flatMap(message => Array.isArray(message?.content) ? message.content : [])
-    .filter((item): item is BetaToolResultBlock => 
-      typeof item === 'object' && item.type === 'tool_result'
-    );
-
-  const totalImages = toolResultBlocks.reduce((count, toolResult) => {
-    if (!Array.isArray(toolResult.content)) return count;
-    return count + toolResult.content.filter(
-      content => typeof content === 'object' && content.type === 'image'
-    ).length;
-  }, 0);
-
-  let imagesToRemove = Math.floor((totalImages - imagesToKeep) / minRemovalThreshold) * minRemovalThreshold;
-
-  for (const toolResult of toolResultBlocks) {
-    if (Array.isArray(toolResult.content)) {
-      toolResult.content = toolResult.content.filter(content => {
+  // Single pass recording where every tool-result image lives, oldest first
+  const images: { content: unknown[]; index: number }[] = [];
+  for (const message of messages) {
+    if (!Array.isArray(message?.content)) continue;
+    for (const item of message.content) {
+      if (typeof item !== 'object' || item.type !== 'tool_result') continue;
+      const toolResult = item as BetaToolResultBlock;
+      if (!Array.isArray(toolResult.content)) continue;
+      toolResult.content.forEach((content, index) => {
         if (typeof content === 'object' && content.type === 'image') {
-          if (imagesToRemove > 0) {
-            imagesToRemove--;
-            return false;
-          }
+          images.push({ content: toolResult.content as unknown[], index });
         }
-        return true;
       });
     }
   }
+
+  const imagesToRemove = Math.floor((images.length - imagesToKeep) / minRemovalThreshold) * minRemovalThreshold;
+
+  // Remove the oldest images in place, newest of them first so the recorded
+  // indices of the ones still to go stay valid
+  for (let i = imagesToRemove - 1; i >= 0; i--) {
+    const { content, index } = images[i]!;
+    content.splice(index, 1);
+  }
 }
 
 const PROMPT_CACHING_BETA_FLAG = 'prompt-caching-2024-07-31';
@@ -57,21 +53,20 @@ export function injectPromptCaching(messages: BetaMessageParam[]): void {
   
   for (let i = messages.length - 1; i >= 0; i--) {
     const message = messages[i];
-    if (!message) continue;
-    if (message.role === 'user' && Array.isArray(message.content)) {
-      if (breakpointsRemaining > 0) {
-        breakpointsRemaining--;
-        const lastContent = message.content[message.content.length - 1];
-        if (lastContent) {
-          (lastContent as BetaLocalContentBlock).cache_control = { type: 'ephemeral' };
-        }
-      } else {
-        const lastContent = message.content[message.content.length - 1];
-        if (lastContent) {
-          delete (lastContent as BetaLocalContentBlock).cache_control;
-        }
-        break;
+    const content = message?.content;
+    if (message?.role !== 'user' || !Array.isArray(content)) continue;
+
+    const lastContent = content[content.length - 1] as BetaLocalContentBlock | undefined;
+    if (breakpointsRemaining > 0) {
+      breakpointsRemaining--;
+      if (lastContent) {
+        lastContent.cache_control = { type: 'ephemeral' };
+      }
+    } else {
+      if (lastContent) {
+        delete lastContent.cache_control;
       }
+      break;
     }
   }
 }
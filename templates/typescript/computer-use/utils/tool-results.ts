@@ -26,7 +26,7 @@ export function makeApiToolResult(
         type: 'image',
         source: {
           type: 'base64',
-          media_type: 'image/png',
+          media_type: result.imageMediaType ?? 'image/png',
           data: result.base64Image,
         },
       });
@@ -1,10 +1,23 @@
 import { Kernel, type KernelContext } from "@onkernel/sdk";
-import { chromium } from "playwright";
+import { chromium, type Route } from "playwright";
 
 const kernel = new Kernel();
 
 const app = kernel.app("ts-basic");
 
+// Fail fast on unresponsive sites rather than holding the browser for
+// Playwright's 30s default
+const NAVIGATION_TIMEOUT_MS = 15_000;
+
+// Subresources the page title never depends on
+const BLOCKED_RESOURCE_TYPES = new Set(["image", "font", "media", "stylesheet"]);
+
+function blockHeavyResources(route: Route): Promise<void> {
+  return BLOCKED_RESOURCE_TYPES.has(route.request().resourceType())
+    ? route.abort()
+    : route.continue();
+}
+
 /**
  * Example app that extracts the title of a webpage
  * Args:
@@ -60,13 +73,17 @@ app.action<PageTitleInput, PageTitleOutput>(
 
     const browser = await chromium.connectOverCDP(kernelBrowser.cdp_ws_url);
     const context = browser.contexts()[0] || (await browser.newContext());
+    context.setDefaultNavigationTimeout(NAVIGATION_TIMEOUT_MS);
+    await context.route("**/*", blockHeavyResources);
     const page = context.pages()[0] || (await context.newPage());
 
     try {
       //////////////////////////////////////
       // Your browser automation logic here
       //////////////////////////////////////
-      await page.goto(payload.url);
+      // The title is in the parsed HTML, so don't wait for images,
+      // stylesheets and other subresources to finish loading
+      await page.goto(payload.url, { waitUntil: "domcontentloaded" });
       const title = await page.title();
       return { title };
     } finally {